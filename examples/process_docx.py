@@ -21,20 +21,41 @@ Example Usage:
 """
 
 import argparse
+import functools
+import importlib.util
 import json
+import multiprocessing
+import random
+import re
 import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+import torch
 from docx import Document
+from docx.oxml.table import CT_Tc
+from docx.table import Table, _Cell
 from gliner import GLiNER
 
+# Faker is slow to import, so only check for it here; _faker_map imports it on first use
+FAKER_AVAILABLE = importlib.util.find_spec('faker') is not None
+
 try:
-    from faker import Faker
-    FAKER_AVAILABLE = True
-    fake = Faker()
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Only --onnx needs onnxruntime, so load_onnx_model imports it when called
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec('onnxruntime') is not None
+
+try:
+    from gliner import InferencePackingConfig
+    PACKING_AVAILABLE = True
 except ImportError:
-    FAKER_AVAILABLE = False
-    fake = None
+    PACKING_AVAILABLE = False
 
 
 # All available PII types
@@ -77,63 +98,190 @@ PCI_GROUP = [
     'accounts', 'pin', 'money', 'rate', 'planduration'
 ]
 
-# PII to Faker mapping
-PII_TO_FAKER = {
-    "account number": lambda: fake.ean() if fake else "ACC1234567890",
-    "accounts": lambda: fake.ean() if fake else "ACC1234567890",
-    "address": lambda: fake.address().replace('\n', ', ') if fake else "123 Main St, City, State 12345",
-    "age": lambda: str(fake.random_int(min=18, max=90)) if fake else "35",
-    "condition": lambda: fake.random_element(['Hypertension', 'Diabetes', 'Asthma']) if fake else "Medical Condition",
-    "confirmation number": lambda: fake.ean8() if fake else "CONF12345",
-    "county": lambda: f"{fake.city()} County" if fake else "Sample County",
-    "credit card": lambda: fake.credit_card_number() if fake else "4111-1111-1111-1111",
-    "credit card expiration": lambda: fake.credit_card_expire() if fake else "12/25",
-    "cvv": lambda: fake.credit_card_security_code() if fake else "123",
-    "date": lambda: fake.date() if fake else "2024-01-01",
-    "date interval": lambda: f"{fake.date()} to {fake.date()}" if fake and fake else "2024-01-01 to 2024-12-31",
-    "discharge date": lambda: fake.date() if fake else "2024-03-15",
-    "dob": lambda: fake.date_of_birth().strftime('%m/%d/%Y') if fake else "01/01/1990",
-    "duration": lambda: f"{fake.random_int(1, 100)} {fake.random_element(['days', 'weeks', 'months'])}" if fake else "30 days",
-    "email address": lambda: fake.email() if fake else "user@example.com",
-    "esidno": lambda: fake.ean13() if fake else "ESI123456789",
-    "filename": lambda: fake.file_name() if fake else "document.pdf",
-    "gender": lambda: fake.random_element(['Male', 'Female', 'Non-binary']) if fake else "Person",
-    "language": lambda: fake.language_name() if fake else "English",
-    "location": lambda: fake.city() if fake else "City Name",
-    "location address": lambda: fake.address().replace('\n', ', ') if fake else "123 Main St, City, State 12345",
-    "location address street": lambda: fake.street_address() if fake else "123 Main Street",
-    "location city": lambda: fake.city() if fake else "Anytown",
-    "location country": lambda: fake.country() if fake else "United States",
-    "location state": lambda: fake.state() if fake else "California",
-    "location zip": lambda: fake.postcode() if fake else "12345",
-    "marital status": lambda: fake.random_element(['Single', 'Married', 'Divorced']) if fake else "Status",
-    "medical process": lambda: fake.random_element(['Surgery', 'X-Ray', 'MRI', 'Blood Test']) if fake else "Medical Procedure",
-    "money": lambda: f"${fake.random_int(100, 100000):,}" if fake else "$50,000",
-    "month": lambda: fake.month_name() if fake else "January",
-    "name": lambda: fake.name() if fake else "John Doe",
-    "name family": lambda: fake.last_name() if fake else "Doe",
-    "name given": lambda: fake.first_name() if fake else "John",
-    "name medical professional": lambda: f"Dr. {fake.name()}" if fake else "Dr. Smith",
-    "number": lambda: str(fake.random_int(1, 999999)) if fake else "12345",
-    "numerical pii": lambda: fake.ean() if fake else "NUM123456",
-    "occupation": lambda: fake.job() if fake else "Professional",
-    "organization": lambda: fake.company() if fake else "Example Corp",
-    "organization medical facility": lambda: f"{fake.company()} Hospital" if fake else "General Hospital",
-    "origin": lambda: fake.country() if fake else "Country",
-    "passport number": lambda: fake.passport_number() if fake else "P12345678",
-    "password": lambda: fake.password() if fake else "SecurePass123",
-    "phone number": lambda: fake.phone_number() if fake else "(555) 123-4567",
-    "physical attribute": lambda: fake.random_element(['Tall', 'Short', 'Athletic']) if fake else "Description",
-    "pin": lambda: str(fake.random_int(1000, 9999)) if fake else "1234",
-    "planduration": lambda: f"{fake.random_int(1, 36)} months" if fake else "12 months",
-    "policy number": lambda: f"POL-{fake.ean8()}" if fake else "POL-12345678",
-    "rate": lambda: f"{fake.random_int(1, 100)}%" if fake else "5%",
-    "ssn": lambda: fake.ssn() if fake else "123-45-6789",
-    "test result": lambda: fake.random_element(['Positive', 'Negative', 'Normal']) if fake else "Result",
-    "time": lambda: fake.time() if fake else "12:00:00",
-    "zip": lambda: fake.postcode() if fake else "12345"
+# Cheap regex signals that text must contain for a PII type to be present.
+# Texts with no hint for any active type skip inference entirely; types
+# without an entry here are always sent to the model.
+PII_HINTS = {
+    'account number': r'\d',
+    'accounts': r'\d',
+    'confirmation number': r'\d',
+    'credit card': r'\d',
+    'credit card expiration': r'\d',
+    'cvv': r'\d',
+    'email address': r'@',
+    'esidno': r'\d',
+    'location zip': r'\d',
+    'money': r'\d|[$€£¥]|dollar|euro|pound|cent',
+    'numerical pii': r'\d',
+    'passport number': r'\d',
+    'phone number': r'\d',
+    'pin': r'\d',
+    'planduration': r'\d|day|week|month|year',
+    'policy number': r'\d',
+    'rate': r'\d|%|percent',
+    'ssn': r'\d',
+    'zip': r'\d'
 }
 
+# Texts of at most PACK_MAX_CHARS characters are packed into encoder sequences
+# of up to PACK_MAX_TOKENS tokens (label prompt included) when --pack is set.
+# Characters, unlike whitespace words, also bound unspaced runs such as
+# "a@x.com;b@y.com", leaving room in the budget for the label prompt
+PACK_MAX_CHARS = 200
+PACK_MAX_TOKENS = 512
+
+# Generic replacements used when Faker is not installed
+PII_FALLBACKS = {
+    "account number": "ACC1234567890",
+    "accounts": "ACC1234567890",
+    "address": "123 Main St, City, State 12345",
+    "age": "35",
+    "condition": "Medical Condition",
+    "confirmation number": "CONF12345",
+    "county": "Sample County",
+    "credit card": "4111-1111-1111-1111",
+    "credit card expiration": "12/25",
+    "cvv": "123",
+    "date": "2024-01-01",
+    "date interval": "2024-01-01 to 2024-12-31",
+    "discharge date": "2024-03-15",
+    "dob": "01/01/1990",
+    "duration": "30 days",
+    "email address": "user@example.com",
+    "esidno": "ESI123456789",
+    "filename": "document.pdf",
+    "gender": "Person",
+    "language": "English",
+    "location": "City Name",
+    "location address": "123 Main St, City, State 12345",
+    "location address street": "123 Main Street",
+    "location city": "Anytown",
+    "location country": "United States",
+    "location state": "California",
+    "location zip": "12345",
+    "marital status": "Status",
+    "medical process": "Medical Procedure",
+    "money": "$50,000",
+    "month": "January",
+    "name": "John Doe",
+    "name family": "Doe",
+    "name given": "John",
+    "name medical professional": "Dr. Smith",
+    "number": "12345",
+    "numerical pii": "NUM123456",
+    "occupation": "Professional",
+    "organization": "Example Corp",
+    "organization medical facility": "General Hospital",
+    "origin": "Country",
+    "passport number": "P12345678",
+    "password": "SecurePass123",
+    "phone number": "(555) 123-4567",
+    "physical attribute": "Description",
+    "pin": "1234",
+    "planduration": "12 months",
+    "policy number": "POL-12345678",
+    "rate": "5%",
+    "ssn": "123-45-6789",
+    "test result": "Result",
+    "time": "12:00:00",
+    "zip": "12345"
+}
+
+
+# Value pools for choice-based replacements
+_CONDITIONS = ('Hypertension', 'Diabetes', 'Asthma')
+_DURATION_UNITS = ('days', 'weeks', 'months')
+_GENDERS = ('Male', 'Female', 'Non-binary')
+_MARITAL_STATUSES = ('Single', 'Married', 'Divorced')
+_MEDICAL_PROCESSES = ('Surgery', 'X-Ray', 'MRI', 'Blood Test')
+_PHYSICAL_ATTRIBUTES = ('Tall', 'Short', 'Athletic')
+_TEST_RESULTS = ('Positive', 'Negative', 'Normal')
+
+
+@functools.lru_cache(maxsize=None)
+def _faker_map() -> Dict[str, Callable[[], str]]:
+    """Map each PII type to a replacement generator, built on first use.
+
+    Uses Faker when installed and the generic PII_FALLBACKS values otherwise,
+    so detection-only runs never pay for Faker or these generators.
+    """
+    if not FAKER_AVAILABLE:
+        return {pii_type: (lambda value=value: value) for pii_type, value in PII_FALLBACKS.items()}
+
+    from faker import Faker
+
+    fake = Faker()
+    return {
+        "account number": fake.ean,
+        "accounts": fake.ean,
+        "address": lambda: fake.address().replace('\n', ', '),
+        "age": lambda: str(random.randint(18, 90)),
+        "condition": lambda: random.choice(_CONDITIONS),
+        "confirmation number": fake.ean8,
+        "county": lambda: f"{fake.city()} County",
+        "credit card": fake.credit_card_number,
+        "credit card expiration": fake.credit_card_expire,
+        "cvv": fake.credit_card_security_code,
+        "date": fake.date,
+        "date interval": lambda: f"{fake.date()} to {fake.date()}",
+        "discharge date": fake.date,
+        "dob": lambda: fake.date_of_birth().strftime('%m/%d/%Y'),
+        "duration": lambda: f"{random.randint(1, 100)} {random.choice(_DURATION_UNITS)}",
+        "email address": fake.email,
+        "esidno": fake.ean13,
+        "filename": fake.file_name,
+        "gender": lambda: random.choice(_GENDERS),
+        "language": fake.language_name,
+        "location": fake.city,
+        "location address": lambda: fake.address().replace('\n', ', '),
+        "location address street": fake.street_address,
+        "location city": fake.city,
+        "location country": fake.country,
+        "location state": fake.state,
+        "location zip": fake.postcode,
+        "marital status": lambda: random.choice(_MARITAL_STATUSES),
+        "medical process": lambda: random.choice(_MEDICAL_PROCESSES),
+        "money": lambda: f"${random.randint(100, 100000):,}",
+        "month": fake.month_name,
+        "name": fake.name,
+        "name family": fake.last_name,
+        "name given": fake.first_name,
+        "name medical professional": lambda: f"Dr. {fake.name()}",
+        "number": lambda: str(random.randint(1, 999999)),
+        "numerical pii": fake.ean,
+        "occupation": fake.job,
+        "organization": fake.company,
+        "organization medical facility": lambda: f"{fake.company()} Hospital",
+        "origin": fake.country,
+        "passport number": fake.passport_number,
+        "password": fake.password,
+        "phone number": fake.phone_number,
+        "physical attribute": lambda: random.choice(_PHYSICAL_ATTRIBUTES),
+        "pin": lambda: str(random.randint(1000, 9999)),
+        "planduration": lambda: f"{random.randint(1, 36)} months",
+        "policy number": lambda: f"POL-{fake.ean8()}",
+        "rate": lambda: f"{random.randint(1, 100)}%",
+        "ssn": fake.ssn,
+        "test result": lambda: random.choice(_TEST_RESULTS),
+        "time": fake.time,
+        "zip": fake.postcode
+    }
+
+
+def iter_table_cells(table: Table) -> Iterator[Tuple[int, int, CT_Tc, str]]:
+    """Yield (row, column, cell element, text) for each non-empty table cell.
+
+    Walks the table's <w:tr>/<w:tc> elements directly rather than building
+    python-docx row and cell wrappers, so merged cells are yielded once.
+    """
+    for row_idx, tr in enumerate(table._tbl.tr_lst):
+        col_idx = 0
+        for tc in tr.tc_lst:
+            text = '\n'.join(p.text for p in tc.p_lst)
+            if text.strip():
+                yield row_idx, col_idx, tc, text
+            col_idx += tc.grid_span
+
 
 def extract_all_text(document: Document) -> List[Dict[str, str]]:
     """Extract all text from document including tables."""
@@ -150,55 +298,305 @@ def extract_all_text(document: Document) -> List[Dict[str, str]]:
 
     # Extract tables
     for table_idx, table in enumerate(document.tables):
-        for row_idx, row in enumerate(table.rows):
-            for col_idx, cell in enumerate(row.cells):
-                if cell.text.strip():
-                    extracted.append({
-                        'type': 'table_cell',
-                        'table': table_idx,
-                        'row': row_idx,
-                        'column': col_idx,
-                        'text': cell.text
-                    })
+        for row_idx, col_idx, _, text in iter_table_cells(table):
+            extracted.append({
+                'type': 'table_cell',
+                'table': table_idx,
+                'row': row_idx,
+                'column': col_idx,
+                'text': text
+            })
 
     return extracted
 
 
+@functools.lru_cache(maxsize=None)
+def redaction_label(pii_type: str) -> str:
+    """Get the generic redaction marker for a PII type."""
+    return f"[{pii_type.upper().replace(' ', '_')}]"
+
+
 def get_replacement(pii_type: str, original_text: str) -> str:
     """Get a replacement value for a PII type."""
-    if pii_type in PII_TO_FAKER:
-        return PII_TO_FAKER[pii_type]()
-    return f"[{pii_type.upper().replace(' ', '_')}]"
+    replacer = _faker_map().get(pii_type)
+    return replacer() if replacer else redaction_label(pii_type)
+
+
+def _capitalize_first(text: str) -> str:
+    """Uppercase the first character of text, leaving the rest unchanged."""
+    return text[:1].upper() + text[1:]
+
+
+# Capitalization transforms indexed by (all uppercase << 1) | (first letter uppercase)
+_CASE_TRANSFORMS = (lambda text: text, _capitalize_first, str.upper, str.upper)
 
 
 def replace_pii_in_text(text: str, entities: List[Dict]) -> str:
-    """Replace PII in text with fake data or redactions."""
+    """Replace PII in text with fake data or redactions.
+
+    Entities must carry character 'start'/'end' offsets, as GLiNER predictions do.
+    """
     if not entities:
         return text
 
-    sorted_entities = sorted(entities, key=lambda x: x.get('start', 0), reverse=True)
-    modified_text = text
+    parts = []
+    pos = 0
 
-    for entity in sorted_entities:
-        replacement = get_replacement(entity['label'], entity['text'])
+    # Build the output in one forward pass instead of re-slicing per entity
+    for entity in sorted(entities, key=lambda x: x['start']):
+        original = entity['text']
+        replacement = get_replacement(entity['label'], original)
 
         # Preserve capitalization
-        if entity['text'].isupper():
-            replacement = replacement.upper()
-        elif entity['text'] and entity['text'][0].isupper():
-            replacement = replacement[0].upper() + replacement[1:] if len(replacement) > 1 else replacement.upper()
+        case = (original.isupper() << 1) | original[:1].isupper()
+        replacement = _CASE_TRANSFORMS[case](replacement)
+
+        parts.append(text[pos:entity['start']])
+        parts.append(replacement)
+        pos = entity['end']
+
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+def worker_num_threads(workers: int) -> int:
+    """Split the default intra-op thread count evenly across worker processes."""
+    # torch already picks physical cores and honours OMP_NUM_THREADS/MKL_NUM_THREADS
+    return max(1, torch.get_num_threads() // workers)
+
+
+def onnx_export_dir(model_name: str) -> Path:
+    """Get the default cache directory for a model's ONNX export."""
+    return Path.home() / '.cache' / 'wordcab-pii' / 'onnx' / model_name.replace('/', '--')
 
-        if 'start' in entity and 'end' in entity:
-            modified_text = modified_text[:entity['start']] + replacement + modified_text[entity['end']:]
-        else:
-            modified_text = modified_text.replace(entity['text'], replacement, 1)
 
-    return modified_text
+def export_onnx(model_name: str, onnx_dir: Path) -> None:
+    """Export the model to ONNX with int8 dynamic quantization, unless already exported."""
+    if (onnx_dir / 'model.onnx').exists():
+        return
+    print(f"Exporting {model_name} to ONNX: {onnx_dir}...")
+    GLiNER.from_pretrained(model_name).export_to_onnx(onnx_dir, quantize=True)
+
+
+def load_onnx_model(onnx_dir: Path, num_threads: Optional[int] = None) -> GLiNER:
+    """Load an ONNX export on ONNX Runtime (CPU), preferring the int8 quantized graph."""
+    import onnxruntime as ort
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        session_options.intra_op_num_threads = num_threads
+
+    onnx_file = 'model_quantized.onnx'
+    if not (onnx_dir / onnx_file).exists():
+        # GLiNER only warns when quantization fails, leaving just the fp32 graph
+        print(f"Note: No int8 quantized graph in {onnx_dir}. Running the fp32 ONNX model.")
+        onnx_file = 'model.onnx'
+    return GLiNER.from_pretrained(str(onnx_dir), load_onnx_model=True, load_tokenizer=True,
+                                  onnx_model_file=onnx_file, session_options=session_options)
+
+
+def load_model(model_name: str, num_threads: Optional[int] = None,
+               onnx_dir: Optional[Path] = None) -> GLiNER:
+    """Load a GLiNER model on GPU when available, in bfloat16 where supported.
+
+    When onnx_dir is given, the ONNX export stored there is loaded instead.
+    """
+    if onnx_dir is not None:
+        return load_onnx_model(onnx_dir, num_threads)
+
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if device == 'cuda' and torch.cuda.is_bf16_supported():
+        dtype = torch.bfloat16
+    else:
+        dtype = torch.float32
+
+    if device == 'cpu' and num_threads:
+        # Worker processes share the cores, so each one gets its slice
+        torch.set_num_threads(num_threads)
+        torch.set_num_interop_threads(2)
+
+    model = GLiNER.from_pretrained(model_name).to(device, dtype=dtype)
+    model.eval()
+    return model
+
+
+def is_bi_encoder(model: GLiNER) -> bool:
+    """Check whether the model encodes labels separately from the text."""
+    return getattr(model.config, 'labels_encoder', None) is not None
+
+
+def run_model(model: GLiNER, texts: List[str], pii_types: List[str],
+              threshold: float, batch_size: int, pack: bool = False) -> List[List[Dict]]:
+    """Run batched inference over texts as given, one entity list per text.
+
+    With pack, short texts such as table cells share packed encoder
+    sequences, with attention kept within each text.
+    """
+    groups = [(range(len(texts)), None)]
+    if pack:
+        # Longer texts keep the regular path, since GLiNER cuts packed texts at the token budget
+        short, rest = [], []
+        for i, text in enumerate(texts):
+            (short if len(text) <= PACK_MAX_CHARS else rest).append(i)
+        groups = [(short, InferencePackingConfig(max_length=PACK_MAX_TOKENS)), (rest, None)]
+
+    entities = [None] * len(texts)
+    with torch.inference_mode():
+        labels_embeddings = None
+        # Exported ONNX graphs have no separate label encoder to call
+        if is_bi_encoder(model) and not getattr(model, 'onnx_model', False):
+            # Labels are encoded separately, so embed them once for the whole run
+            labels_embeddings = model.encode_labels(pii_types)
+
+        for indices, packing_config in groups:
+            if not indices:
+                continue
+            group_texts = [texts[i] for i in indices]
+            kwargs = {'threshold': threshold, 'batch_size': batch_size}
+            if packing_config is not None:
+                kwargs['packing_config'] = packing_config
+
+            if labels_embeddings is not None:
+                group_entities = model.batch_predict_with_embeds(group_texts, labels_embeddings,
+                                                                 pii_types, **kwargs)
+            elif hasattr(model, 'inference'):
+                group_entities = model.inference(group_texts, pii_types, **kwargs)
+            else:
+                # Older GLiNER releases only have the batch_predict_entities entry point
+                group_entities = model.batch_predict_entities(group_texts, pii_types, **kwargs)
+
+            for i, text_entities in zip(indices, group_entities):
+                entities[i] = text_entities
+
+    return entities
+
+
+def compile_model(model: GLiNER, pii_types: List[str], batch_size: int,
+                  pack: bool = False) -> None:
+    """Compile the model with torch.compile and warm it up on dummy batches.
+
+    Compilation uses dynamic shapes, so a single-text batch and a full batch
+    are enough to cover the shapes seen while processing a document. With
+    pack, the packed path is warmed up as well.
+    """
+    model.compile()
+    sample = "John Smith called from 415-555-1234 about account 12345678."
+    for size in dict.fromkeys((1, batch_size)):
+        run_model(model, [sample] * size, pii_types, 0.5, batch_size)
+        if pack:
+            # Packed batches use a per-text attention mask, which compiles separately
+            run_model(model, [sample] * size, pii_types, 0.5, batch_size, pack=True)
+
+
+# Model held by each worker process, loaded once by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_name: str, num_threads: int, onnx_dir: Optional[Path],
+                 use_compile: bool, pii_types: List[str], batch_size: int, pack: bool) -> None:
+    """Load the model in a worker process."""
+    global _worker_model
+    _worker_model = load_model(model_name, num_threads, onnx_dir)
+    if use_compile:
+        compile_model(_worker_model, pii_types, batch_size, pack)
+
+
+def _predict_shard(texts: List[str], pii_types: List[str], threshold: float,
+                   batch_size: int, pack: bool) -> List[List[Dict]]:
+    """Run the worker's model over one shard of texts."""
+    return run_model(_worker_model, texts, pii_types, threshold, batch_size, pack)
+
+
+def run_sharded(model_name: str, workers: int, onnx_dir: Optional[Path], use_compile: bool,
+                texts: List[str], pii_types: List[str], threshold: float,
+                batch_size: int, pack: bool = False) -> List[List[Dict]]:
+    """Split texts across worker processes that each hold their own model copy."""
+    workers = min(workers, len(texts))
+    # Interleave texts so long and short elements are spread evenly across shards
+    shards = [texts[i::workers] for i in range(workers)]
+    initargs = (model_name, worker_num_threads(workers), onnx_dir, use_compile, pii_types,
+                batch_size, pack)
+
+    predict_shard = functools.partial(_predict_shard, pii_types=pii_types, threshold=threshold,
+                                      batch_size=batch_size, pack=pack)
+
+    # Unlike Pool, the executor breaks (rather than respawning forever) if a worker fails to load
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=initargs) as executor:
+        shard_entities = list(executor.map(predict_shard, shards))
+
+    entities = [None] * len(texts)
+    for i, shard in enumerate(shard_entities):
+        entities[i::workers] = shard
+    return entities
+
+
+def make_predictor(args, pii_types: List[str]) -> Callable[[List[str]], List[List[Dict]]]:
+    """Load the model, or set up worker processes, and return a texts-to-entities function."""
+    onnx_dir = None
+    if args.onnx:
+        onnx_dir = Path(args.onnx_dir) if args.onnx_dir else onnx_export_dir(args.model)
+        export_onnx(args.model, onnx_dir)
+
+    if args.workers > 1:
+        print(f"Using {args.workers} worker processes for model: {args.model}")
+        return functools.partial(run_sharded, args.model, args.workers, onnx_dir, args.compile,
+                                 pii_types=pii_types, threshold=args.threshold,
+                                 batch_size=args.batch_size, pack=args.pack)
+
+    print(f"Loading model: {args.model}{' (ONNX Runtime)' if args.onnx else ''}...")
+    model = load_model(args.model, onnx_dir=onnx_dir)
+    if args.compile:
+        print("Compiling model...")
+        compile_model(model, pii_types, args.batch_size, args.pack)
+    return functools.partial(run_model, model, pii_types=pii_types, threshold=args.threshold,
+                             batch_size=args.batch_size, pack=args.pack)
+
+
+def build_pii_hint(pii_types: List[str]) -> Optional[re.Pattern]:
+    """Build a prefilter regex for the PII types, or None if any type has no hint."""
+    if not all(pii_type in PII_HINTS for pii_type in pii_types):
+        return None
+    patterns = dict.fromkeys(PII_HINTS[pii_type] for pii_type in pii_types)
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+
+def predict_all(predict: Callable[[List[str]], List[List[Dict]]], texts: List[str],
+                pii_types: List[str], prefilter: bool = True,
+                disable_hint: str = 'pass --no-prefilter') -> List[List[Dict]]:
+    """Run the predictor over all texts, returning one entity list per text.
+
+    disable_hint tells the user how to turn the prefilter off for this command.
+    """
+    if not texts:
+        return []
+
+    # Repeated texts (headers, boilerplate, table labels) only need one forward pass
+    unique_texts = list(dict.fromkeys(texts))
+    entities_by_text = {text: [] for text in unique_texts}
+
+    hint = build_pii_hint(pii_types) if prefilter else None
+    if hint is not None:
+        total = len(unique_texts)
+        unique_texts = [text for text in unique_texts if hint.search(text)]
+        skipped = total - len(unique_texts)
+        if skipped:
+            # Spelled-out values (e.g. "four three two one") have no hint, so say what was skipped
+            print(f"Prefilter skipped {skipped} of {total} unique text(s) with no PII hint; "
+                  f"{disable_hint} to run the model on every text")
+        if not unique_texts:
+            return [entities_by_text[text] for text in texts]
+
+    unique_entities = predict(unique_texts)
+    entities_by_text.update(zip(unique_texts, unique_entities))
+    return [entities_by_text[text] for text in texts]
 
 
 def normalize_pii_types(pii_types: List[str]) -> List[str]:
     """Convert user-friendly underscore format to internal space format."""
-    return [pii_type.replace('_', ' ') for pii_type in pii_types]
+    # Every label is part of the model prompt, so drop repeats (e.g. 'ssn ssn')
+    return list(dict.fromkeys(pii_type.replace('_', ' ') for pii_type in pii_types))
 
 
 def get_pii_types(args) -> List[str]:
@@ -217,6 +615,54 @@ def get_pii_types(args) -> List[str]:
         return ALL_PII_TYPES
 
 
+def dump_json(results: Dict) -> bytes:
+    """Serialize results as indented JSON, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(results, option=orjson.OPT_INDENT_2)
+    # Keep non-ASCII characters as UTF-8, as orjson does, rather than \uXXXX escapes
+    return json.dumps(results, indent=2, ensure_ascii=False).encode()
+
+
+def print_results(results: Dict, fmt: str) -> None:
+    """Print detection results in the requested format."""
+    if fmt == 'summary':
+        print("\n" + "=" * 60)
+        print("PII DETECTION SUMMARY")
+        print("=" * 60)
+        print(f"Total PII instances found: {results['summary']['total_pii_instances']}")
+
+        if results['summary']['pii_by_type']:
+            print("\nPII by type:")
+            for pii_type, instances in results['summary']['pii_by_type'].items():
+                # Unique values in first-seen order, computed once per type
+                unique = list(dict.fromkeys(instances))
+                print(f"\n{pii_type}: {len(instances)} instance(s)")
+                for inst in unique[:5]:
+                    print(f"  - {inst}")
+                extra = len(unique) - 5
+                if extra > 0:
+                    print(f"  ... and {extra} more unique value(s)")
+        else:
+            print("\nNo PII detected with current settings.")
+
+    elif fmt == 'json':
+        print(dump_json(results).decode())
+
+    elif fmt == 'redacted':
+        print("\n" + "=" * 60)
+        print("REDACTED CONTENT")
+        print("=" * 60)
+        for element in results['pii_found']:
+            print(f"\n[{element['element_type'].upper()}]")
+            print(element['redacted'])
+
+
+def write_json(results: Dict, path: str) -> None:
+    """Write detection results to a JSON file."""
+    with open(path, 'wb') as f:
+        f.write(dump_json(results))
+
+
 def cmd_detect(args):
     """Detect PII in document."""
     if not Path(args.input).exists():
@@ -225,8 +671,7 @@ def cmd_detect(args):
 
     pii_types = get_pii_types(args)
 
-    print(f"Loading model: {args.model}...")
-    model = GLiNER.from_pretrained(args.model)
+    predict = make_predictor(args, pii_types)
 
     print(f"Processing: {args.input}")
     print(f"Detecting {len(pii_types)} PII type(s)")
@@ -242,20 +687,26 @@ def cmd_detect(args):
     document = Document(args.input)
     content = extract_all_text(document)
 
+    pii_by_type = defaultdict(list)
     results = {
         'document': args.input,
         'total_elements': len(content),
         'pii_found': [],
         'summary': {
             'total_pii_instances': 0,
-            'pii_by_type': {}
+            'pii_by_type': pii_by_type
         }
     }
 
-    # Process each element
-    for element in content:
-        entities = model.predict_entities(element['text'], pii_types, threshold=args.threshold)
+    # Process all elements in batches
+    texts = [element['text'] for element in content]
+    try:
+        all_entities = predict_all(predict, texts, pii_types, not args.no_prefilter)
+    except BrokenProcessPool:
+        print("Error: A worker process failed to load the model (see the worker traceback above)")
+        return 1
 
+    for element, entities in zip(content, all_entities):
         if entities:
             element_result = {
                 'element_type': element['type'],
@@ -268,47 +719,17 @@ def cmd_detect(args):
 
             results['pii_found'].append(element_result)
 
+            results['summary']['total_pii_instances'] += len(entities)
             for entity in entities:
-                pii_type = entity['label']
-                results['summary']['total_pii_instances'] += 1
-                if pii_type not in results['summary']['pii_by_type']:
-                    results['summary']['pii_by_type'][pii_type] = []
-                results['summary']['pii_by_type'][pii_type].append(entity['text'])
-
-    # Output results
-    if args.format == 'summary':
-        print("\n" + "=" * 60)
-        print("PII DETECTION SUMMARY")
-        print("=" * 60)
-        print(f"Total PII instances found: {results['summary']['total_pii_instances']}")
+                pii_by_type[entity['label']].append(entity['text'])
 
-        if results['summary']['pii_by_type']:
-            print("\nPII by type:")
-            for pii_type, instances in results['summary']['pii_by_type'].items():
-                unique = list(set(instances))[:5]
-                print(f"\n{pii_type}: {len(instances)} instance(s)")
-                for inst in unique:
-                    print(f"  - {inst}")
-                if len(set(instances)) > 5:
-                    print(f"  ... and {len(set(instances)) - 5} more unique value(s)")
-        else:
-            print("\nNo PII detected with current settings.")
-
-    elif args.format == 'json':
-        print(json.dumps(results, indent=2))
-
-    elif args.format == 'redacted':
-        print("\n" + "=" * 60)
-        print("REDACTED CONTENT")
-        print("=" * 60)
-        for element in results['pii_found']:
-            print(f"\n[{element['element_type'].upper()}]")
-            print(element['redacted'])
+    # Write the results file in the background while the report is printed
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        saving = executor.submit(write_json, results, args.output) if args.output else None
+        print_results(results, args.format)
 
-    # Save if requested
-    if args.output:
-        with open(args.output, 'w') as f:
-            json.dump(results, f, indent=2)
+    if saving is not None:
+        saving.result()
         print(f"\nResults saved to: {args.output}")
 
     return 0
@@ -326,8 +747,7 @@ def cmd_replace(args):
 
     pii_types = get_pii_types(args)
 
-    print(f"Loading model: {args.model}...")
-    model = GLiNER.from_pretrained(args.model)
+    predict = make_predictor(args, pii_types)
 
     print(f"Processing: {args.input}")
     print(f"Replacing {len(pii_types)} PII type(s)")
@@ -335,33 +755,39 @@ def cmd_replace(args):
     document = Document(args.input)
     replacements_made = 0
 
-    # Process paragraphs
+    # Collect paragraphs and table cells
+    targets = []
     for paragraph in document.paragraphs:
-        if paragraph.text.strip():
-            entities = model.predict_entities(paragraph.text, pii_types, threshold=args.threshold)
-            if entities:
-                new_text = replace_pii_in_text(paragraph.text, entities)
-                if new_text != paragraph.text:
-                    paragraph.text = new_text
-                    replacements_made += len(entities)
-
-    # Process tables
+        text = paragraph.text
+        if text.strip():
+            targets.append((paragraph, text))
+
     for table in document.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                if cell.text.strip():
-                    entities = model.predict_entities(cell.text, pii_types, threshold=args.threshold)
-                    if entities:
-                        new_text = replace_pii_in_text(cell.text, entities)
-                        if new_text != cell.text:
-                            cell.text = new_text
-                            replacements_made += len(entities)
-
-    # Save modified document
+        for _, _, tc, text in iter_table_cells(table):
+            targets.append((_Cell(tc, table), text))
+
+    # Detect in batches, then write replacements back
+    texts = [text for _, text in targets]
+    try:
+        all_entities = predict_all(predict, texts, pii_types, args.prefilter, 'drop --prefilter')
+    except BrokenProcessPool:
+        print("Error: A worker process failed to load the model (see the worker traceback above)")
+        return 1
+
+    for (target, text), entities in zip(targets, all_entities):
+        if entities:
+            new_text = replace_pii_in_text(text, entities)
+            if new_text != text:
+                target.text = new_text
+                replacements_made += len(entities)
+
+    # Save modified document in the background while the summary is printed
     output_path = args.output or args.input.replace('.docx', '_anonymized.docx')
-    document.save(output_path)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        saving = executor.submit(document.save, output_path)
+        print(f"\nCompleted! Made {replacements_made} replacements")
+        saving.result()
 
-    print(f"\nCompleted! Made {replacements_made} replacements")
     print(f"Anonymized document saved to: {output_path}")
 
     if FAKER_AVAILABLE:
@@ -386,6 +812,20 @@ def main():
                               help='Model name or path')
     detect_parser.add_argument('--threshold', type=float, default=0.5,
                               help='Detection threshold (default: 0.5)')
+    detect_parser.add_argument('--batch-size', type=int, default=32,
+                              help='Number of texts per inference batch (default: 32)')
+    detect_parser.add_argument('--no-prefilter', action='store_true',
+                              help='Run the model on every text, even ones with no cheap PII hint')
+    detect_parser.add_argument('--compile', action='store_true',
+                              help='Compile the model with torch.compile (slower startup, faster on large documents)')
+    detect_parser.add_argument('--workers', type=int, default=1,
+                              help='Worker processes, each with its own model copy (useful on CPU-only machines)')
+    detect_parser.add_argument('--onnx', action='store_true',
+                              help='Run on ONNX Runtime with an int8-quantized export of the model (CPU)')
+    detect_parser.add_argument('--onnx-dir',
+                              help='Directory for the ONNX export (default: ~/.cache/wordcab-pii/onnx/<model>)')
+    detect_parser.add_argument('--pack', action='store_true',
+                              help='Pack short texts such as table cells into shared encoder sequences')
 
     # PII type selection (mutually exclusive groups)
     pii_group = detect_parser.add_mutually_exclusive_group()
@@ -409,6 +849,20 @@ def main():
                                help='Model name or path')
     replace_parser.add_argument('--threshold', type=float, default=0.3,
                                help='Detection threshold')
+    replace_parser.add_argument('--batch-size', type=int, default=32,
+                               help='Number of texts per inference batch')
+    replace_parser.add_argument('--prefilter', action='store_true',
+                               help='Skip the model on texts with no cheap PII hint (may miss spelled-out values)')
+    replace_parser.add_argument('--compile', action='store_true',
+                               help='Compile the model with torch.compile (slower startup, faster on large documents)')
+    replace_parser.add_argument('--workers', type=int, default=1,
+                               help='Worker processes, each with its own model copy (useful on CPU-only machines)')
+    replace_parser.add_argument('--onnx', action='store_true',
+                               help='Run on ONNX Runtime with an int8-quantized export of the model (CPU)')
+    replace_parser.add_argument('--onnx-dir',
+                               help='Directory for the ONNX export (default: ~/.cache/wordcab-pii/onnx/<model>)')
+    replace_parser.add_argument('--pack', action='store_true',
+                               help='Pack short texts such as table cells into shared encoder sequences')
 
     # PII type selection (mutually exclusive groups)
     replace_pii_group = replace_parser.add_mutually_exclusive_group()
@@ -427,6 +881,19 @@ def main():
         parser.print_help()
         return 1
 
+    if args.onnx and not ONNXRUNTIME_AVAILABLE:
+        print("Error: --onnx requires onnxruntime. Install with: uv pip install onnxruntime")
+        return 1
+    if args.onnx and args.compile:
+        print("Error: --compile only applies to PyTorch models and cannot be used with --onnx")
+        return 1
+    if args.pack and not PACKING_AVAILABLE:
+        print("Error: --pack requires a GLiNER release with inference packing. Upgrade with: uv pip install -U gliner")
+        return 1
+    if args.pack and args.onnx:
+        print("Error: --pack only applies to PyTorch models and cannot be used with --onnx")
+        return 1
+
     # Execute command
     if args.command == 'detect':
         return cmd_detect(args)